@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from transformers import AutoTokenizer
+
+from vllm.tgis_utils.batch_tokenizer import AsyncDynamicBatchTokenizer
+from vllm.transformers_utils.tokenizer_group import get_tokenizer_group
+
+from ..conftest import get_tokenizer_pool_config
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_batch_size", [1, 4, 32])
+async def test_dynamic_batch_tokenizer(max_batch_size):
+    reference_tokenizer = AutoTokenizer.from_pretrained("gpt2")
+    tokenizer_group = get_tokenizer_group(
+        get_tokenizer_pool_config(None),
+        tokenizer_id="gpt2",
+        enable_lora=False,
+        max_num_seqs=1,
+        max_input_length=None,
+    )
+    batch_tokenizer = AsyncDynamicBatchTokenizer(tokenizer_group,
+                                                 max_batch_size=max_batch_size)
+
+    prompts = [f"prompt {i} " * (i + 1) for i in range(20)]
+    # Mix of calls with and without truncation, submitted concurrently
+    results = await asyncio.gather(*(
+        batch_tokenizer.encode(p, truncation=True, max_length=3) if i %
+        2 else batch_tokenizer.encode(p) for i, p in enumerate(prompts)))
+    await batch_tokenizer.close()
+
+    expected_results = [
+        reference_tokenizer.encode(p, truncation=True, max_length=3) if i %
+        2 else reference_tokenizer.encode(p) for i, p in enumerate(prompts)
+    ]
+    assert results == expected_results
+
+
+@pytest.mark.asyncio
+async def test_dynamic_batch_tokenizer_close_during_batch():
+
+    class BlockingTokenizerGroup:
+        """Tokenizer group whose batch encoding never completes."""
+
+        def __init__(self):
+            self.started = asyncio.Event()
+
+        async def encode_async_batch(self, prompts, **kwargs):
+            self.started.set()
+            await asyncio.Event().wait()
+
+    tokenizer_group = BlockingTokenizerGroup()
+    batch_tokenizer = AsyncDynamicBatchTokenizer(tokenizer_group)
+
+    encodes = [
+        asyncio.create_task(batch_tokenizer.encode(f"prompt {i}"))
+        for i in range(3)
+    ]
+    await tokenizer_group.started.wait()
+    await batch_tokenizer.close()
+
+    # Callers of the in-progress batch must not be left waiting
+    done, pending = await asyncio.wait(encodes, timeout=5)
+    assert not pending
+    assert all(task.cancelled() for task in done)
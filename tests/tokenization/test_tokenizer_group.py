@@ -36,6 +36,31 @@ async def test_tokenizer_group(tokenizer_group_type):
         None) == await tokenizer_group.get_lora_tokenizer_async(None)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tokenizer_group_type", [None, "ray"])
+async def test_tokenizer_group_batch(tokenizer_group_type):
+    reference_tokenizer = AutoTokenizer.from_pretrained("gpt2")
+    tokenizer_group = get_tokenizer_group(
+        get_tokenizer_pool_config(tokenizer_group_type),
+        tokenizer_id="gpt2",
+        enable_lora=False,
+        max_num_seqs=1,
+        max_input_length=None,
+    )
+    prompts = [f"prompt {i} " * (i + 1) for i in range(8)]
+    assert [reference_tokenizer.encode(p) for p in prompts
+            ] == await tokenizer_group.encode_async_batch(
+                prompts, request_id="request_id", lora_request=None)
+    truncated = await tokenizer_group.encode_async_batch(prompts,
+                                                         truncation=True,
+                                                         max_length=4)
+    assert truncated == [
+        reference_tokenizer.encode(p, truncation=True, max_length=4)
+        for p in prompts
+    ]
+    assert await tokenizer_group.encode_async_batch([]) == []
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("tokenizer_group_type", ["ray"])
 async def test_tokenizer_group_pool(tokenizer_group_type):
@@ -1,9 +1,12 @@
 import argparse
-import inspect
+import asyncio
+import copy
+import heapq
+import itertools
+import os
 import time
-import uuid
-from typing import (Any, AsyncIterator, Dict, List, MutableSequence, Optional,
-                    Tuple, Union)
+from typing import (TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple,
+                    Union)
 
 import grpc
 from grpc import StatusCode, aio
@@ -31,8 +34,14 @@ from vllm.entrypoints.grpc.pb.generation_pb2 import (BatchedGenerationRequest,
 from vllm.entrypoints.openai.serving_completion import merge_async_iterators
 from vllm.logger import init_logger
 from vllm.sequence import Logprob
+from vllm.tgis_utils.batch_tokenizer import AsyncDynamicBatchTokenizer
 from vllm.tgis_utils.logits_processors import TypicalLogitsWarperWrapper
 from vllm.transformers_utils.tokenizer_group import BaseTokenizerGroup
+from vllm.utils import LRUCache
+
+if TYPE_CHECKING:
+    from google.protobuf.internal.containers import (
+        RepeatedCompositeFieldContainer)
 
 logger = init_logger(__name__)
 
@@ -41,9 +50,19 @@ MAX_TOP_N_TOKENS = 10
 MAX_STOP_SEQS = 6
 MAX_STOP_SEQ_LENGTH = 240
 
+SAMPLING_PARAMS_CACHE_SIZE = 256
+
+MAX_RECEIVE_MESSAGE_LENGTH = 64 << 20
+
+GRPC_COMPRESSION = {
+    None: grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+
 
-def with_default(value: Any, default: Any) -> Any:
-    return value if value else default
+def _logprob_key(item: Tuple[int, Logprob]) -> float:
+    return item[1].logprob
 
 
 async def _handle_exception(e: Exception, func, *args, **kwargs):
@@ -59,21 +78,13 @@ async def _handle_exception(e: Exception, func, *args, **kwargs):
 
 
 def log_rpc_handler_errors(func):
-    if inspect.isasyncgenfunction(func):
-
-        async def func_with_log(*args, **kwargs):
-            try:
-                async for val in func(*args, **kwargs):
-                    yield val
-            except Exception as e:
-                await _handle_exception(e, func, *args, **kwargs)
-    else:
-
-        async def func_with_log(*args, **kwargs):
-            try:
-                return await func(*args, **kwargs)
-            except Exception as e:
-                await _handle_exception(e, func, *args, **kwargs)
+    # Only for unary handlers, streaming handlers catch their errors inline
+    # to avoid wrapping every yielded response in another async generator
+    async def func_with_log(*args, **kwargs):
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            await _handle_exception(e, func, *args, **kwargs)
 
     return func_with_log
 
@@ -88,15 +99,41 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
         self.tokenizer: Union[PreTrainedTokenizer,
                               PreTrainedTokenizerFast] = None
         self.config: ModelConfig = None
+        # Token strings indexed by id, for the base vocab
+        self._id2tok: List[str] = []
+        self._batch_tokenizer: Optional[AsyncDynamicBatchTokenizer] = None
+        self._params_cache = LRUCache[SamplingParams](
+            capacity=SAMPLING_PARAMS_CACHE_SIZE)
 
         self.max_max_new_tokens = args.max_new_tokens
         self.skip_special_tokens = not args.output_special_tokens
         self.default_include_stop_seqs = args.default_include_stop_seqs
+        self.enable_dynamic_batch_tokenizer = \
+            args.enable_dynamic_batch_tokenizer
+        self.dynamic_batch_tokenizer_max_batch_size = \
+            args.dynamic_batch_tokenizer_max_batch_size
+        self.dynamic_batch_tokenizer_wait_s = \
+            args.dynamic_batch_tokenizer_wait_s
 
     async def _post_init(self):
         self.config = await self.engine.get_model_config()
         self.tokenizer_group = await self.engine.get_tokenizer_group()
         self.tokenizer = await self.engine.get_tokenizer()
+        # Look up all of the base vocab once, per-token conversions of
+        # generated/top-n tokens can then be done via plain list indexing
+        self._id2tok = self.tokenizer.convert_ids_to_tokens(
+            list(range(self.tokenizer.vocab_size)))
+
+        if self.enable_dynamic_batch_tokenizer:
+            self._batch_tokenizer = AsyncDynamicBatchTokenizer(
+                self.tokenizer_group,
+                max_batch_size=self.dynamic_batch_tokenizer_max_batch_size,
+                batch_wait_timeout_s=self.dynamic_batch_tokenizer_wait_s,
+            )
+
+    async def close(self):
+        if self._batch_tokenizer is not None:
+            await self._batch_tokenizer.close()
 
     @log_rpc_handler_errors
     async def Generate(self, request: BatchedGenerationRequest,
@@ -104,21 +141,31 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
         request_id = self.request_id(context)
         sampling_params, deadline = await self._validate_and_convert_params(
             request.params, context)
-        truncate_input_tokens = with_default(
-            request.params.truncate_input_tokens, None)
+        truncate_input_tokens = request.params.truncate_input_tokens or None
         request_count = len(request.requests)
-
-        generators = []
-        max_is_token_limit = [False] * request_count
-        for i, req in enumerate(request.requests):
-            input_ids, max_is_token_limit[i]\
-                = await self._validate_prompt_and_tokenize(
-                    sampling_params, truncate_input_tokens, req.text, context)
-            generators.append(
-                self.engine.generate(None,
-                                     sampling_params,
-                                     f"{request_id}-{i}",
-                                     prompt_token_ids=input_ids))
+        sub_request_ids = [f"{request_id}-{i}" for i in range(request_count)]
+
+        # Tokenize all of the prompts in a single batch
+        input_ids_list = await self._tokenize_prompts(
+            [req.text for req in request.requests], truncate_input_tokens)
+
+        # Validate all of the prompts before submitting any of them
+        max_is_token_limit = [
+            await self._validate_input_length(sampling_params,
+                                              len(input_ids), context)
+            for input_ids in input_ids_list
+        ]
+
+        # The requests are all added to the engine together once
+        # merge_async_iterators starts consuming the generators
+        generators = [
+            self.engine.generate(None,
+                                 sampling_params,
+                                 sub_request_id,
+                                 prompt_token_ids=input_ids)
+            for sub_request_id, input_ids in zip(sub_request_ids,
+                                                 input_ids_list)
+        ]
 
         # TODO handle cancellation
         result_generator: AsyncIterator[Tuple[
@@ -126,90 +173,102 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
 
         resp_options = request.params.response
         responses: List = [None] * request_count
+        # Number of requests that haven't produced any output yet
+        pending = request_count
         time_limit_reached = False
+        now = time.time
         async for i, res in result_generator:
             # if await raw_request.is_disconnected():
             #     # Abort the request if the client disconnects.
-            #     await self.engine.abort(f"{request_id}-{i}")
+            #     await self.engine.abort(sub_request_ids[i])
             #     return self.create_error_response("Client disconnected")
+            if responses[i] is None:
+                pending -= 1
             responses[i] = res
 
-            if deadline is not None and time.time(
-            ) >= deadline and None not in responses:
-                for j in range(request_count):
-                    await self.engine.abort(f"{request_id}-{j}")
+            if deadline is not None and pending == 0 and now() >= deadline:
+                await asyncio.gather(*(self.engine.abort(sub_request_id)
+                                       for sub_request_id in sub_request_ids))
                 time_limit_reached = True
                 break
 
         for i, res in enumerate(responses):
-            # Text prompt is not returned if only token_ids are passed
-            res.prompt = request.requests[i].text
             response = self._convert_output(res.outputs[0], resp_options,
                                             max_is_token_limit[i],
                                             time_limit_reached)
-            responses[i] = self._convert_input_details(res, resp_options,
-                                                       sampling_params,
-                                                       response)
+            # Text prompt is not returned if only token_ids are passed,
+            # so it is passed through from the request
+            responses[i] = self._convert_input_details(
+                res, request.requests[i].text, resp_options,
+                sampling_params, response)
 
         return BatchedGenerationResponse(responses=responses)
 
-    @log_rpc_handler_errors
     async def GenerateStream(
             self, request: SingleGenerationRequest,
             context: ServicerContext) -> AsyncIterator[GenerationResponse]:
-        request_id = self.request_id(context)
-        sampling_params, deadline = await self._validate_and_convert_params(
-            request.params, context)
-        truncate_input_tokens = with_default(
-            request.params.truncate_input_tokens, None)
-
-        input_ids, max_is_tok_limit = await self._validate_prompt_and_tokenize(
-            sampling_params, truncate_input_tokens, request.request.text,
-            context)
-
-        result_generator = self.engine.generate(
-            prompt=None,
-            sampling_params=sampling_params,
-            request_id=request_id,
-            prompt_token_ids=input_ids,
-        )
-
-        resp_options = request.params.response
-
-        first = True
-        last_output_length = 0
-        last_token_count = 0
-        time_limit_reached = False
-        #TODO handle cancellation
-        async for result in result_generator:
-            if first:
-                # Text prompt is not returned if only token_ids are passed
-                result.prompt = request.request.text
-                first_response = self._convert_input_details(
-                    result, resp_options, sampling_params,
-                    GenerationResponse())
-                yield first_response
-                first = False
-
-            output = result.outputs[0]
-
-            if deadline is not None and time.time() >= deadline:
-                await self.engine.abort(request_id)
-                time_limit_reached = True
-
-            # Convert output text and token_ids to deltas
-            yield self._convert_output(output, resp_options, max_is_tok_limit,
-                                       time_limit_reached, last_output_length,
-                                       last_token_count)
-            if time_limit_reached:
-                break
+        # Errors are handled here rather than with log_rpc_handler_errors,
+        # which would add another async generator hop for every response
+        try:
+            request_id = self.request_id(context)
+            sampling_params, deadline = \
+                await self._validate_and_convert_params(request.params,
+                                                        context)
+            truncate_input_tokens = \
+                request.params.truncate_input_tokens or None
+
+            input_ids, max_is_tok_limit = \
+                await self._validate_prompt_and_tokenize(
+                    sampling_params, truncate_input_tokens,
+                    request.request.text, context)
+
+            result_generator = self.engine.generate(
+                prompt=None,
+                sampling_params=sampling_params,
+                request_id=request_id,
+                prompt_token_ids=input_ids,
+            )
 
-            last_output_length = len(output.text)
-            last_token_count = len(output.token_ids)
+            resp_options = request.params.response
+
+            first = True
+            last_output_length = 0
+            last_token_count = 0
+            time_limit_reached = False
+            #TODO handle cancellation
+            async for result in result_generator:
+                if first:
+                    # Text prompt is not returned if only token_ids are
+                    # passed, so it is passed through from the request
+                    first_response = self._convert_input_details(
+                        result, request.request.text, resp_options,
+                        sampling_params, GenerationResponse())
+                    yield first_response
+                    first = False
+
+                output = result.outputs[0]
+
+                if deadline is not None and time.time() >= deadline:
+                    await self.engine.abort(request_id)
+                    time_limit_reached = True
+
+                # Convert output text and token_ids to deltas
+                yield self._convert_output(output, resp_options,
+                                           max_is_tok_limit,
+                                           time_limit_reached,
+                                           last_output_length,
+                                           last_token_count)
+                if time_limit_reached:
+                    break
+
+                last_output_length = len(output.text)
+                last_token_count = len(output.token_ids)
+        except Exception as e:
+            await _handle_exception(e, self.GenerateStream, request, context)
 
     def _convert_input_details(
-            self, result: RequestOutput, resp_options: ResponseOptions,
-            sampling_params: SamplingParams,
+            self, result: RequestOutput, prompt: str,
+            resp_options: ResponseOptions, sampling_params: SamplingParams,
             response: GenerationResponse) -> GenerationResponse:
 
         response.input_token_count = len(result.prompt_token_ids)
@@ -224,8 +283,8 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
             )
 
         if resp_options.input_text:
-            response.text = result.prompt if not response.text \
-                else result.prompt + response.text
+            response.text = prompt if not response.text \
+                else prompt + response.text
 
         if sampling_params.seed is not None:
             response.seed = sampling_params.seed
@@ -241,12 +300,14 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
 
         stop_reason, stop_sequence = self._convert_reason(
             output, max_is_token_limit, time_limit_reached)
-        response = GenerationResponse(
-            text=output.text[text_start_offset:],
-            generated_token_count=len(output.token_ids),
-            stop_reason=stop_reason,
-            stop_sequence=stop_sequence,
-        )
+        response = GenerationResponse()
+        # Only the new tail of the text is copied here, full responses
+        # (offset 0) reuse the output's str object without copying
+        response.text = output.text[text_start_offset:]
+        response.generated_token_count = len(output.token_ids)
+        response.stop_reason = stop_reason
+        if stop_sequence is not None:
+            response.stop_sequence = stop_sequence
 
         if resp_options.generated_tokens:
             self._convert_tokens(
@@ -262,7 +323,7 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
 
     @staticmethod
     def request_id(context: ServicerContext) -> str:
-        return uuid.uuid4().hex
+        return os.urandom(16).hex()
 
     async def _validate_and_convert_params(
             self, params: Parameters, context: ServicerContext
@@ -272,10 +333,47 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
         resp_options = params.response
         sampling = params.sampling
         stopping = params.stopping
+        decoding = params.decoding
         greedy = params.method == DecodingMethod.GREEDY
 
+        # Read field presence and optional values from the protobuf once
+        has_length_penalty = decoding.HasField("length_penalty")
+        seed = sampling.seed if sampling.HasField("seed") else None
+        include_stop_sequence = stopping.include_stop_sequence \
+            if stopping.HasField("include_stop_sequence") else None
+        stop_sequences = stopping.stop_sequences
+
+        time_limit_millis = stopping.time_limit_millis
+        deadline = time.time(
+        ) + time_limit_millis / 1000.0 if time_limit_millis > 0 else None
+
+        # Most requests share a few parameter combinations, so the converted
+        # SamplingParams are cached, keyed on everything they're built from
+        params_key = (
+            greedy,
+            has_length_penalty,
+            decoding.repetition_penalty,
+            stopping.max_new_tokens,
+            stopping.min_new_tokens,
+            tuple(stop_sequences),
+            include_stop_sequence,
+            sampling.temperature,
+            sampling.top_k,
+            sampling.top_p,
+            sampling.typical_p,
+            seed,
+            resp_options.token_logprobs,
+            resp_options.token_ranks,
+            resp_options.top_n_tokens,
+            resp_options.input_tokens,
+        )
+        sampling_params = self._params_cache.get(params_key)
+        if sampling_params is not None:
+            # Copy since max_tokens may be adjusted per request
+            return copy.copy(sampling_params), deadline
+
         try:
-            if params.decoding.HasField("length_penalty"):
+            if has_length_penalty:
                 raise ValueError(
                     "decoding.length_penalty parameter not yet supported")
 
@@ -298,10 +396,10 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
                     raise ValueError(f"min_new_tokens ({min_new_tokens}) "
                                      f"must be <= {self.max_max_new_tokens}")
 
-            if stopping.stop_sequences and (
-                    len(stopping.stop_sequences) > MAX_STOP_SEQS) or \
-                    not all(0 < len(ss) <= MAX_STOP_SEQ_LENGTH
-                            for ss in stopping.stop_sequences):
+            if stop_sequences and (
+                    len(stop_sequences) > MAX_STOP_SEQS
+                    or max(map(len, stop_sequences)) > MAX_STOP_SEQ_LENGTH
+                    or min(map(len, stop_sequences)) == 0):
                 raise ValueError(
                     f"can specify at most {MAX_STOP_SEQS} non-empty stop "
                     f"sequences, each not more than {MAX_STOP_SEQ_LENGTH} "
@@ -323,7 +421,7 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
                 if greedy and resp_options.token_logprobs:
                     logprobs -= 1
 
-            logprobs = with_default(logprobs, None)
+            logprobs = logprobs or None
 
             # GAPS:
             # - exp_decay_length_penalty
@@ -348,27 +446,22 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
             else:
                 logits_processors = None
 
-            time_limit_millis = stopping.time_limit_millis
-            deadline = time.time(
-            ) + time_limit_millis / 1000.0 if time_limit_millis > 0 else None
-
             sampling_params = SamplingParams(
                 logprobs=logprobs,
                 prompt_logprobs=logprobs
                 if resp_options.input_tokens else None,
                 max_tokens=max_new_tokens,
                 min_tokens=min_new_tokens,
-                temperature=with_default(sampling.temperature, 1.0)
+                temperature=(sampling.temperature or 1.0)
                 if not greedy else 0.0,
-                top_k=with_default(sampling.top_k, -1),
-                top_p=with_default(sampling.top_p, 1.0),
-                seed=sampling.seed if sampling.HasField("seed") else None,
-                repetition_penalty=with_default(
-                    params.decoding.repetition_penalty, 1.0),
+                top_k=sampling.top_k or -1,
+                top_p=sampling.top_p or 1.0,
+                seed=seed,
+                repetition_penalty=decoding.repetition_penalty or 1.0,
                 logits_processors=logits_processors,
-                stop=with_default(stopping.stop_sequences, None),
-                include_stop_str_in_output=stopping.include_stop_sequence
-                if stopping.HasField("include_stop_sequence") else
+                stop=stop_sequences or None,
+                include_stop_str_in_output=include_stop_sequence
+                if include_stop_sequence is not None else
                 self.default_include_stop_seqs,
                 skip_special_tokens=self.skip_special_tokens,
             )
@@ -376,7 +469,8 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
             #TODO run TGIS param validation here to match TGIS error messages
             await context.abort(StatusCode.INVALID_ARGUMENT, str(e))
 
-        return sampling_params, deadline
+        self._params_cache.put(params_key, sampling_params)
+        return copy.copy(sampling_params), deadline
 
     @staticmethod
     def _convert_reason(output: CompletionOutput, max_is_token_limit: bool,
@@ -417,17 +511,25 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
         include_logprobs: bool,
         include_ranks: bool,
         top_n_tokens: int,
-        token_infos: MutableSequence[TokenInfo],  # OUT
+        token_infos: "RepeatedCompositeFieldContainer[TokenInfo]",  # OUT
         token_start_offset: int = 0,
     ):
         if token_start_offset:
             token_ids = token_ids[token_start_offset:]
             if logprobs_list is not None:
                 logprobs_list = logprobs_list[token_start_offset:]
-        #TODO later use get_lora_tokenizer here
-        token_texts = self.tokenizer.convert_ids_to_tokens(token_ids)
+        # Bind to locals to avoid attribute lookups in the per-token loop
+        convert_ids_to_tokens = self._convert_ids_to_tokens
+        add_token_info = token_infos.add
+        nlargest = heapq.nlargest
+
+        token_texts = convert_ids_to_tokens(token_ids)
         for i, text in enumerate(token_texts):
-            token_info = TokenInfo(text=text)
+            # Construct in-place in the repeated field
+            token_info = add_token_info()
+            # Ids without a token (e.g. padded vocab rows) convert to None
+            if text is not None:
+                token_info.text = text
             if logprobs_list is not None:
                 logprobs = logprobs_list[i]
                 # Logprobs entry will be None for first prompt token
@@ -439,20 +541,44 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
                         if include_ranks:
                             token_info.rank = logprob.rank
                     if top_n_tokens:
-                        items = sorted(logprobs.items(),
-                                       key=lambda item: item[1].logprob,
-                                       reverse=True)[:top_n_tokens]
-                        #TODO later use get_lora_tokenizer here
-                        tt_texts = self.tokenizer.convert_ids_to_tokens(
+                        items = nlargest(top_n_tokens,
+                                         logprobs.items(),
+                                         key=_logprob_key)
+                        tt_texts = convert_ids_to_tokens(
                             [tid for tid, _ in items])
-                        token_info.top_tokens.extend(
-                            TokenInfo.TopToken(
-                                text=tt_text,
-                                logprob=(logprob.logprob
-                                         if include_logprobs else None),
-                            )
-                            for tt_text, (_, logprob) in zip(tt_texts, items))
-            token_infos.append(token_info)
+                        add_top_token = token_info.top_tokens.add
+                        for tt_text, (_, logprob) in zip(tt_texts, items):
+                            top_token = add_top_token()
+                            if tt_text is not None:
+                                top_token.text = tt_text
+                            if include_logprobs:
+                                top_token.logprob = logprob.logprob
+
+    def _convert_ids_to_tokens(self, token_ids: List[int]) -> List[str]:
+        #TODO later use get_lora_tokenizer here
+        id2tok = self._id2tok
+        try:
+            return [id2tok[token_id] for token_id in token_ids]
+        except IndexError:
+            # Added/special tokens outside of the base vocab
+            return self.tokenizer.convert_ids_to_tokens(token_ids)
+
+    async def _tokenize_prompts(
+            self, prompts: List[str],
+            truncate_input_tokens: Optional[int]) -> List[List[int]]:
+        tokenize_kwargs = {"truncation": True,
+                           "max_length": truncate_input_tokens} \
+            if truncate_input_tokens is not None else {}
+
+        if len(prompts) == 1 and self._batch_tokenizer is not None:
+            # Coalesce with other concurrent single-prompt requests
+            return [
+                await self._batch_tokenizer.encode(prompts[0],
+                                                   **tokenize_kwargs)
+            ]
+
+        return await self.tokenizer_group.encode_async_batch(
+            prompts, **tokenize_kwargs)
 
     async def _validate_prompt_and_tokenize(
         self,
@@ -461,15 +587,18 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
         prompt: Optional[str],
         context: ServicerContext,
     ) -> Tuple[List[int], bool]:
-        tokenize_kwargs = {"truncation": True,
-                           "max_length": truncate_input_tokens} \
-            if truncate_input_tokens is not None else {}
+        input_ids = (await self._tokenize_prompts([prompt],
+                                                  truncate_input_tokens))[0]
+        max_is_token_limit = await self._validate_input_length(
+            sampling_params, len(input_ids), context)
+        return input_ids, max_is_token_limit
 
-        max_model_len = self.config.max_model_len
-        input_ids = await self.tokenizer_group.encode_async(
-            prompt, **tokenize_kwargs)
-        token_num = len(input_ids)
+    async def _validate_input_length(self, sampling_params: SamplingParams,
+                                     token_num: int,
+                                     context: ServicerContext) -> bool:
+        """ Returns whether max_tokens is limited by the model length """
 
+        max_model_len = self.config.max_model_len
         if token_num >= max_model_len:
             await context.abort(
                 StatusCode.INVALID_ARGUMENT,
@@ -493,22 +622,31 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
             sampling_params.max_tokens = max_model_len - token_num
             max_is_token_limit = True
 
-        return input_ids, max_is_token_limit
+        return max_is_token_limit
 
     @log_rpc_handler_errors
     async def Tokenize(self, request: BatchedTokenizeRequest,
                        context: ServicerContext) -> BatchedTokenizeResponse:
-        responses: List[TokenizeResponse] = []
-
-        #TODO maybe parallelize, also move convert_ids_to_tokens
-        # into the other threads
-        for req in request.requests:
-            token_ids = await self.tokenizer_group.encode_async(req.text)
-            responses.append(
-                TokenizeResponse(
-                    token_count=len(token_ids),
-                    tokens=None if not request.return_tokens else
-                    self.tokenizer.convert_ids_to_tokens(token_ids)))
+        token_ids_list = await self.tokenizer_group.encode_async_batch(
+            [req.text for req in request.requests])
+
+        if not request.return_tokens:
+            responses = [
+                TokenizeResponse(token_count=len(token_ids))
+                for token_ids in token_ids_list
+            ]
+        else:
+            # Convert all of the ids in one call, then split per request
+            all_tokens = self.tokenizer.convert_ids_to_tokens(
+                list(itertools.chain.from_iterable(token_ids_list)))
+            responses = []
+            offset = 0
+            for token_ids in token_ids_list:
+                end = offset + len(token_ids)
+                responses.append(
+                    TokenizeResponse(token_count=len(token_ids),
+                                     tokens=all_tokens[offset:end]))
+                offset = end
 
         return BatchedTokenizeResponse(responses=responses)
 
@@ -523,14 +661,35 @@ class TextGenerationService(generation_pb2_grpc.GenerationServiceServicer):
         )
 
 
-async def start_grpc_server(engine: AsyncLLMEngine,
-                            args: argparse.Namespace) -> aio.Server:
-
-    # Log memory summary after model is loaded
+def _log_memory_summary(device) -> None:
     from torch.cuda import memory_summary
-    logger.info(memory_summary(engine.engine.device_config.device))
-
-    server = aio.server()
+    try:
+        logger.info(memory_summary(device))
+    except Exception:
+        logger.exception("Failed to get memory summary")
+
+
+async def start_grpc_server(
+        engine: AsyncLLMEngine, args: argparse.Namespace
+) -> Tuple[aio.Server, TextGenerationService]:
+    """ Returns (server, service), the service should be closed once the
+    server has stopped """
+
+    # Log memory summary after model is loaded, in the background since
+    # it can be slow and isn't needed for the server to start
+    asyncio.get_running_loop().run_in_executor(
+        None, _log_memory_summary, engine.engine.device_config.device)
+
+    server = aio.server(
+        compression=GRPC_COMPRESSION[args.grpc_compression],
+        options=[
+            ("grpc.max_send_message_length", -1),
+            ("grpc.max_receive_message_length", MAX_RECEIVE_MESSAGE_LENGTH),
+            ("grpc.http2.max_pings_without_data", 0),
+            ("grpc.keepalive_time_ms", 30000),
+            # Allows multiple server processes to share the port
+            ("grpc.so_reuseport", 1),
+        ])
     service = TextGenerationService(engine, args)
     await service._post_init()
 
@@ -587,4 +746,4 @@ async def start_grpc_server(engine: AsyncLLMEngine,
     await server.start()
     logger.info(f"gRPC Server started at {listen_on}")
 
-    return server
+    return server, service
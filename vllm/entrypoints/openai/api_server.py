@@ -46,13 +46,15 @@ async def lifespan(app: fastapi.FastAPI):
     if not engine_args.disable_log_stats:
         asyncio.create_task(_force_log())
 
-    grpc_server = await start_grpc_server(async_llm_engine, args)
+    grpc_server, grpc_service = await start_grpc_server(
+        async_llm_engine, args)
 
     yield
 
     logger.info("Gracefully stopping gRPC server")
     await grpc_server.stop(30)  #TODO configurable grace
     await grpc_server.wait_for_termination()
+    await grpc_service.close()
     logger.info("gRPC server stopped")
 
 
@@ -23,7 +23,7 @@ class EnvVarArgumentParser(argparse.ArgumentParser):
     def _add_action(self, action):
         val = os.environ.get(_to_env_var(action.dest))
         if val:
-            if action.type == bool:
+            if action.type == bool or isinstance(action.default, bool):
                 val = val.lower() == "true" or val == "1"
             elif action.type == int:
                 val = int(val)
@@ -70,6 +70,27 @@ def add_tgis_args(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
     parser.add_argument('--default-include-stop-seqs', type=bool,
                         default=True)  #TODO TBD
     parser.add_argument('--grpc-port', type=int, default=8033)
+    parser.add_argument('--grpc-compression',
+                        type=str,
+                        choices=['gzip', 'deflate', None],
+                        help='compression algorithm used by default for gRPC '
+                        'responses. Compression adds overhead to small '
+                        'streamed messages but can help with large responses '
+                        'over slow networks.')
+    parser.add_argument('--enable-dynamic-batch-tokenizer',
+                        action='store_true',
+                        help='coalesce concurrent single-prompt tokenization '
+                        'calls into batched tokenizer invocations')
+    parser.add_argument('--dynamic-batch-tokenizer-max-batch-size',
+                        type=int,
+                        default=32,
+                        help='maximum number of prompts tokenized together '
+                        'by the dynamic batch tokenizer')
+    parser.add_argument('--dynamic-batch-tokenizer-wait-s',
+                        type=float,
+                        default=0.002,
+                        help='maximum time in seconds the dynamic batch '
+                        'tokenizer waits to fill a batch')
 
     #TODO check/add other args here including TLS related
 
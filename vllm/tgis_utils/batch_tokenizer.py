@@ -0,0 +1,119 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from vllm.logger import init_logger
+from vllm.transformers_utils.tokenizer_group import BaseTokenizerGroup
+
+logger = init_logger(__name__)
+
+
+class AsyncDynamicBatchTokenizer:
+    """Coalesces concurrent single-prompt encode calls into batched
+    tokenizer invocations.
+
+    Prompts submitted while a batch is being collected are tokenized
+    together with one encode_async_batch call on the tokenizer group, which
+    amortizes the per-call overhead when many requests arrive at the same
+    time. Batches are tokenized wherever the tokenizer group does its work,
+    e.g. on Ray actors when a tokenizer pool is configured.
+    """
+
+    def __init__(self,
+                 tokenizer_group: BaseTokenizerGroup,
+                 max_batch_size: int = 32,
+                 batch_wait_timeout_s: float = 0.002):
+        self.tokenizer_group = tokenizer_group
+        self.max_batch_size = max_batch_size
+        self.batch_wait_timeout_s = batch_wait_timeout_s
+
+        # These are created lazily since they must belong to the running loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None
+
+    async def encode(self, prompt: str, **kwargs) -> List[int]:
+        """Encode a prompt, batched with any other concurrent calls.
+
+        kwargs are passed to encode_async_batch; only prompts with identical
+        kwargs are tokenized in the same call.
+        """
+        if self._batcher_task is None:
+            self._queue = asyncio.Queue()
+            self._batcher_task = asyncio.create_task(self._batch_loop())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((prompt, kwargs, future))
+        return await future
+
+    async def close(self):
+        """Stop the background batching task.
+
+        Any prompts that are queued or being tokenized are cancelled.
+        """
+        if self._batcher_task is None:
+            return
+        self._batcher_task.cancel()
+        try:
+            await self._batcher_task
+        except asyncio.CancelledError:
+            pass
+        self._batcher_task = None
+
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            future.cancel()
+        self._queue = None
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.batch_wait_timeout_s
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(
+                            self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._process_batch(batch)
+            except asyncio.CancelledError:
+                # Closed while collecting or tokenizing this batch, cancel
+                # its callers so that they don't wait forever
+                for _, _, future in batch:
+                    if not future.done():
+                        future.cancel()
+                raise
+            except Exception:
+                logger.exception("Dynamic batch tokenization failed")
+
+    async def _process_batch(
+            self, batch: List[Tuple[str, Dict[str, Any],
+                                    asyncio.Future]]) -> None:
+        # Group by tokenizer kwargs, typically there is only one group
+        groups: Dict[Tuple, List[Tuple[str, asyncio.Future]]] = {}
+        for prompt, kwargs, future in batch:
+            groups.setdefault(tuple(sorted(kwargs.items())), []).append(
+                (prompt, future))
+
+        for kwargs_key, items in groups.items():
+            prompts = [prompt for prompt, _ in items]
+            try:
+                input_ids_list = await self.tokenizer_group.encode_async_batch(
+                    prompts, **dict(kwargs_key))
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), input_ids in zip(items, input_ids_list):
+                # The caller may have been cancelled in the meantime
+                if not future.done():
+                    future.set_result(input_ids)
@@ -38,6 +38,17 @@ class BaseTokenizerGroup(ABC):
         """Encode a prompt using the tokenizer group."""
         pass
 
+    @abstractmethod
+    async def encode_async_batch(
+            self,
+            prompts: List[str],
+            request_id: Optional[str] = None,
+            lora_request: Optional[LoRARequest] = None,
+            truncation: bool = False,
+            max_length: Optional[int] = None) -> List[List[int]]:
+        """Encode a batch of prompts using the tokenizer group."""
+        pass
+
     @abstractmethod
     def get_lora_tokenizer(
             self,
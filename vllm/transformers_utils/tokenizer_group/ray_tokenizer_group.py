@@ -133,6 +133,39 @@ class RayTokenizerGroupPool(BaseTokenizerGroup):
             self._idle_actors.put_nowait(actor)
         return ret
 
+    async def encode_async_batch(
+            self,
+            prompts: List[str],
+            request_id: Optional[str] = None,
+            lora_request: Optional[LoRARequest] = None,
+            truncation: bool = False,
+            max_length: Optional[int] = None) -> List[List[int]]:
+        """Encode a batch of prompts using the tokenizer group.
+
+        The whole batch is sent to a single idle actor, so that it is
+        tokenized with one call rather than one call per prompt.
+        This is non-blocking.
+        """
+        if not prompts:
+            return []
+        self._ensure_queue_initialized()
+
+        actor = await self._idle_actors.get()
+        try:
+            ret = await actor.encode_async_batch.remote(
+                request_id=request_id,
+                prompts=prompts,
+                lora_request=lora_request,
+                truncation=truncation,
+                max_length=max_length)
+        finally:
+            # Put the actor back in the queue.
+            # This is done in a finally block to ensure that the actor is
+            # always put back in the queue, even if an exception/cancellation
+            # is raised.
+            self._idle_actors.put_nowait(actor)
+        return ret
+
     def get_max_input_len(self,
                           lora_request: Optional[LoRARequest] = None
                           ) -> Optional[int]:
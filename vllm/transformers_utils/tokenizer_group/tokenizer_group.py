@@ -1,3 +1,6 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import List, Optional
 
 from transformers import PreTrainedTokenizer
@@ -23,6 +26,12 @@ class TokenizerGroup(BaseTokenizerGroup):
         self.tokenizer = get_tokenizer(self.tokenizer_id, **tokenizer_config)
         self.lora_tokenizers = LRUCache[PreTrainedTokenizer](
             capacity=max_num_seqs) if enable_lora else None
+        # HF fast tokenizers change the shared Rust tokenizer's truncation
+        # settings on each call, so concurrent calls from different threads
+        # can conflict. Async encoding is done on a single thread, the Rust
+        # batch encoding parallelizes internally.
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix="tokenizer")
 
     def ping(self) -> bool:
         """Check if the tokenizer group is alive."""
@@ -47,7 +56,30 @@ class TokenizerGroup(BaseTokenizerGroup):
             request_id: Optional[str] = None,
             lora_request: Optional[LoRARequest] = None) -> List[int]:
         tokenizer = await self.get_lora_tokenizer_async(lora_request)
-        return tokenizer.encode(prompt)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, tokenizer.encode, prompt)
+
+    async def encode_async_batch(
+            self,
+            prompts: List[str],
+            request_id: Optional[str] = None,
+            lora_request: Optional[LoRARequest] = None,
+            truncation: bool = False,
+            max_length: Optional[int] = None) -> List[List[int]]:
+        if not prompts:
+            # Fast tokenizers fail on an empty batch
+            return []
+        tokenizer = await self.get_lora_tokenizer_async(lora_request)
+        # A single batched call lets the fast tokenizer do the work
+        # natively, off the event loop.
+        batch_encoding = await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            partial(tokenizer,
+                    prompts,
+                    padding=False,
+                    truncation=truncation,
+                    max_length=max_length))
+        return batch_encoding["input_ids"]
 
     def get_lora_tokenizer(
             self,